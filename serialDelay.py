@@ -1,8 +1,11 @@
 import argparse
+import collections
+import math
+import os
+import selectors
 import sys
 import threading
 import time
-from queue import Queue, Empty
 
 import serial
 from serial.tools import list_ports
@@ -10,6 +13,25 @@ from serial.tools import list_ports
 # Teensy SerialManager uses a 64-byte buffer including '\0'
 MAX_TEENSY_LINE_LEN = 63
 
+# Teensy executes on LF and ignores CR
+_LF = b"\n"
+_DELAY_CMD = b"d "
+# Fixed precision for the delay argument, e.g. "d 12.345"
+DELAY_FORMAT = ".3f"
+
+# Teensy output is 7-bit ASCII; latin-1 maps every byte straight to a code point,
+# never fails on line noise and is the cheapest decoder in CPython
+RX_ENCODING = "latin-1"
+
+# Max bytes taken from the OS per read in the reader thread
+RX_CHUNK_SIZE = 4096
+
+# Carriage return + erase-to-end-of-line, used to overwrite the input prompt
+_CLR_LINE = "\r\033[K"
+
+# Guards cli_output_printer, which can run on the reader and main threads
+_print_lock = threading.Lock()
+
 # Optional: improves prompt redraw on Linux/macOS (and some Windows terminals)
 try:
     import readline  # type: ignore
@@ -17,8 +39,39 @@ except Exception:
     readline = None
 
 
-def iter_ports():
-    return list(list_ports.comports())
+# Port enumeration rescans the OS (udev/SetupDi/IOKit) and can take 100s of ms;
+# ports rarely change, so reuse a recent scan for a short while.
+_PORTS_TTL = 2.0
+_ports_cache = {"t": 0.0, "v": None}
+
+
+def iter_ports(force: bool = False):
+    now = time.monotonic()
+    if not force and _ports_cache["v"] is not None and now - _ports_cache["t"] < _PORTS_TTL:
+        return list(_ports_cache["v"])
+    ports = list(list_ports.comports())
+    _ports_cache["t"] = now
+    _ports_cache["v"] = ports
+    return list(ports)
+
+
+def _has_manufacturer_attr() -> bool:
+    # Older pyserial port info objects have no 'manufacturer'; it is set per
+    # instance, so probe an instance rather than the class
+    try:
+        from serial.tools.list_ports_common import ListPortInfo
+        return hasattr(ListPortInfo(""), "manufacturer")
+    except Exception:
+        return False
+
+
+# Resolved once at import instead of getattr(p, "manufacturer", "") per port
+if _has_manufacturer_attr():
+    def _get_manu(p):
+        return p.manufacturer or ""
+else:
+    def _get_manu(p):
+        return ""
 
 
 def print_ports():
@@ -28,11 +81,24 @@ def print_ports():
         return
     for p in ports:
         desc = p.description or ""
-        manu = getattr(p, "manufacturer", "") or ""
+        manu = _get_manu(p)
         hwid = p.hwid or ""
         print(f"{p.device:20}  {desc}  {manu}  {hwid}")
 
 
+# (keyword, weight) pairs used by auto_pick_port; matched against the lowercased
+# device/description/manufacturer/hwid text
+_SCORE_RULES = (
+    ("teensy", 50),
+    ("pjrc", 30),
+    ("usb serial", 10),
+    ("ttyacm", 8),
+    ("usbmodem", 8),
+    ("usbserial", 8),
+    ("bluetooth", -50),
+)
+
+
 # def auto_pick_port():
 #     """
 #     Return the COM port for the Teensy whose USB serial number is 11551630.
@@ -69,50 +135,51 @@ def auto_pick_port():
         text = " ".join([
             p.device or "",
             p.description or "",
-            getattr(p, "manufacturer", "") or "",
+            _get_manu(p),
             p.hwid or "",
         ]).lower()
+        return sum(w for kw, w in _SCORE_RULES if kw in text)
 
-        s = 0
-        if "teensy" in text:
-            s += 50
-        if "pjrc" in text:
-            s += 30
-        if "usb serial" in text:
-            s += 10
-
-        if "ttyacm" in text:
-            s += 8
-        if "usbmodem" in text or "usbserial" in text:
-            s += 8
-
-        if "bluetooth" in text:
-            s -= 50
-        return s
-
-    ports_sorted = sorted(ports, key=score, reverse=True)
-    return ports_sorted[0].device
+    return max(ports, key=score).device
 
 
 class SerialDelayClient:
     """
     Backend client for Teensy SerialManager line protocol:
       - send commands terminated with '\n'
-      - read whatever Teensy prints and push to rx_queue
+      - read whatever Teensy prints and append raw bytes to rx_buf, setting rx_ready
+
+    The reader thread is the only producer and there is a single consumer, so
+    deque append/popleft (atomic under the GIL) need no extra locking.
+
+    on_data, if set, is called from the reader thread whenever rx_ready goes from
+    clear to set, so a consumer can be woken instead of polling.
+
+    Each connection gets its own stop event, so a reader that is
+    still winding down after disconnect(wait=False) cannot affect the next one.
     """
 
     def __init__(self):
         self.ser = None
         self._stop_evt = threading.Event()
         self._rx_thread = None
-        self.rx_queue = Queue()  # strings (decoded)
+        self.rx_buf = collections.deque()  # raw bytes chunks, decoded by the consumer
+        self.rx_ready = threading.Event()
+        self.on_data = None  # optional wakeup callback, runs on the reader thread
 
     @staticmethod
-    def list_ports():
-        return iter_ports()
+    def list_ports(force: bool = False):
+        return iter_ports(force=force)
 
     def connect(self, port: str, baud: int = 115200, timeout: float = 0.1, dtr_reset: bool = False,
                 flush_on_open: bool = False):
+        """
+        Open the port and start the reader thread.
+
+        With dtr_reset, DTR is dropped here and raised again 50 ms later on a timer,
+        so this call returns immediately. Callers that need the board to be out of
+        reset before their first send_line() should sleep briefly themselves.
+        """
         self.disconnect()
         self.ser = serial.Serial(port=port, baudrate=baud, timeout=timeout)
 
@@ -120,8 +187,7 @@ class SerialDelayClient:
         if dtr_reset:
             try:
                 self.ser.dtr = False
-                time.sleep(0.05)
-                self.ser.dtr = True
+                threading.Timer(0.05, self._raise_dtr, args=(self.ser,)).start()
             except Exception:
                 pass
 
@@ -133,17 +199,37 @@ class SerialDelayClient:
             except Exception:
                 pass
 
-        self._stop_evt.clear()
-        self._rx_thread = threading.Thread(target=self._reader_loop, daemon=True)
+        self._stop_evt = threading.Event()
+        self._rx_thread = threading.Thread(target=self._reader_loop, args=(self.ser, self._stop_evt),
+                                           daemon=True)
         self._rx_thread.start()
 
-    def disconnect(self):
+    @staticmethod
+    def _raise_dtr(ser):
+        try:
+            if ser.is_open:
+                ser.dtr = True
+        except Exception:
+            pass
+
+    def disconnect(self, wait: bool = True):
+        """
+        Stop the reader and close the port.
+
+        wait=False skips joining the reader thread. Use it from a thread the reader's
+        on_data callback may be blocked on (e.g. the Tk thread), or the two deadlock
+        until the join times out.
+        """
         self._stop_evt.set()
         if self.ser is not None:
             try:
                 self.ser.close()
             except Exception:
                 pass
+        # Reader may be blocked in read(); wait so it can't outlive this port
+        if wait and self._rx_thread is not None and self._rx_thread is not threading.current_thread():
+            self._rx_thread.join(timeout=1.0)
+        self._rx_thread = None
         self.ser = None
 
     def is_connected(self) -> bool:
@@ -155,51 +241,111 @@ class SerialDelayClient:
         line = line.strip()
         if len(line) > MAX_TEENSY_LINE_LEN:
             raise ValueError(f"Command too long for Teensy buffer (max {MAX_TEENSY_LINE_LEN} chars).")
-        # Teensy executes on LF and ignores CR
-        self.ser.write((line + "\n").encode())
+        self.ser.write(line.encode() + _LF)
 
     def set_delay_ms(self, delay_ms: float):
-        self.send_line(f"d {delay_ms}")
+        self._send_delay_fast(delay_ms)
 
-    def _reader_loop(self):
-        while not self._stop_evt.is_set():
+    def _send_delay_fast(self, delay_ms: float):
+        # Hot path while dragging the GUI slider: the command is built here, so it
+        # skips send_line's strip() and keeps only O(1) sanity checks.
+        # Fixed precision keeps float noise (e.g. 20.000000000001) off the wire
+        if not self.is_connected():
+            raise RuntimeError("Not connected")
+        if not math.isfinite(delay_ms):
+            raise ValueError(f"Delay must be a finite number (got {delay_ms}).")
+        cmd = _DELAY_CMD + format(delay_ms, DELAY_FORMAT).encode("ascii")
+        if len(cmd) > MAX_TEENSY_LINE_LEN:
+            raise ValueError(f"Command too long for Teensy buffer (max {MAX_TEENSY_LINE_LEN} chars).")
+        self.ser.write(cmd + _LF)
+
+    def _signal_rx(self):
+        # Only wake the consumer on the clear->set edge; it clears before draining
+        if self.rx_ready.is_set():
+            return
+        self.rx_ready.set()
+        cb = self.on_data
+        if cb is not None:
             try:
-                n = self.ser.in_waiting if self.ser is not None else 0
-                if n:
-                    data = self.ser.read(n)
-                    if data:
-                        self.rx_queue.put(data.decode(errors="replace"))
-                else:
-                    time.sleep(0.01)
-            except Exception as e:
-                self.rx_queue.put(f"\n[Serial read error] {e}\n")
-                self._stop_evt.set()
-                return
-
+                cb()
+            except Exception:
+                pass
 
-def cli_output_printer(client: SerialDelayClient, stop_evt: threading.Event, prompt: str = "> "):
+    @staticmethod
+    def _open_selector(ser):
+        """Selector watching the port's fd, or None where that isn't supported (Windows)."""
+        if sys.platform == "win32":
+            return None
+        try:
+            sel = selectors.DefaultSelector()
+            sel.register(ser.fileno(), selectors.EVENT_READ)
+        except Exception:
+            return None
+        return sel
+
+    def _reader_loop(self, ser, stop_evt: threading.Event):
+        sel = self._open_selector(ser)
+        # Finite wait so the stop flag is rechecked; timeout None/0 would block/spin
+        wait = ser.timeout or 0.1
+        try:
+            while not stop_evt.is_set():
+                try:
+                    if sel is not None:
+                        # Sleep in the kernel until the fd is readable; no ioctl per poll
+                        if not sel.select(timeout=wait):
+                            continue
+                        data = os.read(ser.fileno(), RX_CHUNK_SIZE)
+                        if not data:
+                            raise serial.SerialException(
+                                "device reports readiness to read but returned no data "
+                                "(device disconnected or multiple access on port?)")
+                    else:
+                        # Block in the driver (up to the port timeout) for the first byte,
+                        # then drain whatever else is already buffered in the same call.
+                        # pyserial's read(n) waits for all n bytes, so a fixed large read
+                        # would stall until timeout on short replies.
+                        data = ser.read(ser.in_waiting or 1)
+                    if data and not stop_evt.is_set():
+                        self.rx_buf.append(data)
+                        self._signal_rx()
+                except BlockingIOError:
+                    continue
+                except Exception as e:
+                    if stop_evt.is_set():
+                        return  # port closed by disconnect() while blocked in read
+                    self.rx_buf.append(f"\n[Serial read error] {e}\n".encode(RX_ENCODING, "replace"))
+                    self._signal_rx()
+                    stop_evt.set()
+                    return
+        finally:
+            if sel is not None:
+                sel.close()
+
+
+def cli_output_printer(client: SerialDelayClient, prompt: str = "> "):
     """
-    Prints Teensy output to stdout. If readline is available, tries to redraw the prompt
-    without losing what the user is typing (best-effort, no extra deps).
+    Prints pending Teensy output to stdout. Installed as client.on_data, so it runs
+    directly on the reader thread; no separate printer thread or handoff is needed.
+    A stalled stdout therefore pauses serial reads; the OS tty buffer holds incoming
+    bytes meanwhile. If readline is available, tries to redraw the prompt without
+    losing what the user is typing (best-effort, no extra deps).
     """
-    while not stop_evt.is_set():
-        try:
-            chunk = client.rx_queue.get(timeout=0.05)
-        except Empty:
-            continue
-
-        if not chunk:
-            continue
+    # main() also calls this once from its own thread, so serialize the drain
+    with _print_lock:
+        client.rx_ready.clear()
+        parts = []
+        while client.rx_buf:
+            parts.append(client.rx_buf.popleft())
+        if not parts:
+            return
+        chunk = b"".join(parts).decode(RX_ENCODING)
 
         if readline is not None:
             # Preserve current input buffer (best effort)
             buf = readline.get_line_buffer()
-            # Clear current line, print device output, redraw prompt + buffer
-            sys.stdout.write("\r\033[K")
-            sys.stdout.write(chunk)
-            if not chunk.endswith("\n"):
-                sys.stdout.write("\n")
-            sys.stdout.write(prompt + buf)
+            # Clear current line, print device output, redraw prompt + buffer (one write)
+            nl = "" if chunk.endswith("\n") else "\n"
+            sys.stdout.write(_CLR_LINE + chunk + nl + prompt + buf)
             sys.stdout.flush()
         else:
             sys.stdout.write(chunk)
@@ -246,9 +392,10 @@ def main():
     print("Examples:  h   |  d 10   |  g   |  k 6   |  C")
     print("Type /ports to list ports, /quit to exit.\n")
 
-    stop_evt = threading.Event()
-    t = threading.Thread(target=cli_output_printer, args=(client, stop_evt, "> "), daemon=True)
-    t.start()
+    # Attach after the banner so early device output doesn't interleave with it, then
+    # flush anything already buffered (no prompt yet; input() draws the first one)
+    client.on_data = lambda: cli_output_printer(client, "> ")
+    cli_output_printer(client, "")
 
     try:
         while True:
@@ -273,7 +420,7 @@ def main():
                 print(f"[Local] {e}")
 
     finally:
-        stop_evt.set()
+        client.on_data = None
         client.disconnect()
         print("\nDisconnected.")
 
@@ -1,8 +1,9 @@
+import concurrent.futures
 import tkinter as tk
+from typing import Optional
 from tkinter import ttk, messagebox
-from queue import Empty
 
-from serialDelay import SerialDelayClient
+from serialDelay import DELAY_FORMAT, RX_ENCODING, SerialDelayClient
 
 
 # --- GUI settings ---
@@ -10,6 +11,9 @@ DELAY_MIN_MS = 0.0
 DELAY_MAX_MS = 100.0
 DELAY_STEP_MS = 0.1
 SEND_DEBOUNCE_MS = 120  # avoid spamming Teensy while dragging slider
+PORT_SCAN_POLL_MS = 50  # how often the Tk thread checks for a finished port scan
+RX_FALLBACK_POLL_MS = 500  # safety net in case a <<SerialRx>> wakeup is missed
+CONSOLE_MAX_LINES = 5000  # older output lines are dropped past this many
 
 
 class SerialDelayGUI(tk.Tk):
@@ -19,7 +23,19 @@ class SerialDelayGUI(tk.Tk):
         self.geometry("740x520")
 
         self.client = SerialDelayClient()
-        self._debounce_after_id = None
+        # Port enumeration can stall for 100s of ms; keep it off the Tk thread
+        self._exec = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        # Reader thread wakes the Tk loop via a virtual event instead of timed polling;
+        # client.on_data is attached only while connected (see toggle_connect)
+        self.bind("<<SerialRx>>", lambda _e: self.drain_rx())
+        self._dirty = False  # delay changed since the last send
+        self._send_after_id = None
+        self._pending_val = None  # latest slider/entry value awaiting send
+        self._last_sent = None  # last delay argument (as formatted) written to the current connection
+        # Console output, batched and appended on idle
+        self._log_pending = []  # text not yet inserted into the widget
+        self._log_lines = 0  # newlines currently in the widget
+        self._log_flush_id = None
 
         # ---- Top controls: port + connect ----
         top = ttk.Frame(self)
@@ -31,7 +47,7 @@ class SerialDelayGUI(tk.Tk):
         self.port_combo = ttk.Combobox(top, textvariable=self.port_var, width=35, state="readonly")
         self.port_combo.pack(side="left", padx=(6, 6))
 
-        self.refresh_btn = ttk.Button(top, text="Refresh", command=self.refresh_ports)
+        self.refresh_btn = ttk.Button(top, text="Refresh", command=lambda: self.refresh_ports(force=True))
         self.refresh_btn.pack(side="left")
 
         self.connect_btn = ttk.Button(top, text="Connect", command=self.toggle_connect)
@@ -72,7 +88,7 @@ class SerialDelayGUI(tk.Tk):
         self.delay_entry.bind("<Return>", self.on_entry_set)
         self.delay_entry.bind("<FocusOut>", self.on_entry_set)
 
-        self.set_btn = ttk.Button(row2, text="Send", command=self.send_current_delay)
+        self.set_btn = ttk.Button(row2, text="Send", command=lambda: self.send_current_delay(force=True))
         self.set_btn.pack(side="left")
 
         self.status_var = tk.StringVar(value="Disconnected")
@@ -82,7 +98,7 @@ class SerialDelayGUI(tk.Tk):
         out_frame = ttk.LabelFrame(self, text="Teensy Output")
         out_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
-        self.text = tk.Text(out_frame, wrap="word", height=12)
+        self.text = tk.Text(out_frame, wrap="word", height=12, state="disabled")
         self.text.pack(side="left", fill="both", expand=True)
 
         scroll = ttk.Scrollbar(out_frame, command=self.text.yview)
@@ -93,14 +109,30 @@ class SerialDelayGUI(tk.Tk):
         self.refresh_ports()
         self.update_delay_labels()
 
-        # poll serial RX queue
-        self.after(40, self.poll_rx)
+        # slow fallback poll of the RX buffer
+        self.after(RX_FALLBACK_POLL_MS, self.poll_rx)
 
         # close handling
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
-    def refresh_ports(self):
-        ports = self.client.list_ports()
+    def refresh_ports(self, force: bool = False):
+        if str(self.refresh_btn["state"]) == "disabled":
+            return  # scan already in flight
+        self.refresh_btn.config(state="disabled")
+        fut = self._exec.submit(self.client.list_ports, force=force)
+        # Poll from the Tk thread rather than calling Tk from the worker's done-callback
+        self.after(PORT_SCAN_POLL_MS, self._apply_ports, fut)
+
+    def _apply_ports(self, fut):
+        if not fut.done():
+            self.after(PORT_SCAN_POLL_MS, self._apply_ports, fut)
+            return
+        self.refresh_btn.config(state="normal")
+        try:
+            ports = fut.result()
+        except Exception as e:
+            self.append_text(f"\n[Port scan error] {e}\n")
+            return
         display = []
         for p in ports:
             desc = p.description or ""
@@ -118,7 +150,11 @@ class SerialDelayGUI(tk.Tk):
 
     def toggle_connect(self):
         if self.client.is_connected():
-            self.client.disconnect()
+            # Detach first and don't join: the reader may be blocked in event_generate
+            # waiting for this (Tk) thread
+            self.client.on_data = None
+            self.client.disconnect(wait=False)
+            self._last_sent = None
             self.connect_btn.config(text="Connect")
             self.status_var.set("Disconnected")
             return
@@ -134,6 +170,9 @@ class SerialDelayGUI(tk.Tk):
             messagebox.showerror("Connect failed", str(e))
             return
 
+        self.client.on_data = self._on_rx_data
+        self.drain_rx()  # pick up anything that arrived before on_data was attached
+        self._last_sent = None
         self.connect_btn.config(text="Disconnect")
         self.status_var.set(f"Connected to {dev}")
 
@@ -141,18 +180,22 @@ class SerialDelayGUI(tk.Tk):
         self.send_current_delay()
 
     def update_delay_labels(self):
-        val = float(self.delay_var.get())
+        self._update_labels_from(float(self.delay_var.get()))
+
+    def _update_labels_from(self, val: float):
         self.delay_label_var.set(f"{val:.1f} ms")
         self.delay_entry_var.set(f"{val:.3f}".rstrip("0").rstrip("."))
 
-    def on_slider_move(self, _):
-        # Called frequently while dragging
-        self.update_delay_labels()
+    def on_slider_move(self, val):
+        # Called frequently while dragging; Tk passes the new value, so no delay_var.get()
+        val = float(val)
+        self._update_labels_from(val)
+        self._pending_val = val
 
-        # Debounce sending to Teensy (avoids tons of serial writes)
-        if self._debounce_after_id is not None:
-            self.after_cancel(self._debounce_after_id)
-        self._debounce_after_id = self.after(SEND_DEBOUNCE_MS, self.send_current_delay)
+        # Throttle sending to Teensy: at most one pending timer, no cancel/re-arm per move
+        self._dirty = True
+        if self._send_after_id is None:
+            self._send_after_id = self.after(SEND_DEBOUNCE_MS, self._flush_delay)
 
     def on_entry_set(self, _event=None):
         # Parse entry -> update slider -> send immediately
@@ -163,37 +206,91 @@ class SerialDelayGUI(tk.Tk):
 
         val = max(DELAY_MIN_MS, min(DELAY_MAX_MS, val))
         self.delay_var.set(val)
-        self.update_delay_labels()
-        self.send_current_delay()
-
-    def send_current_delay(self):
+        self._update_labels_from(val)
+        self._pending_val = val
+        if self._send_after_id is not None:
+            self.after_cancel(self._send_after_id)
+        self._dirty = True
+        self._flush_delay()
+
+    def _flush_delay(self):
+        self._send_after_id = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        val, self._pending_val = self._pending_val, None
+        self.send_current_delay(val=val)
+        # Value moved again while sending: send once more after another interval
+        if self._dirty and self._send_after_id is None:
+            self._send_after_id = self.after(SEND_DEBOUNCE_MS, self._flush_delay)
+
+    def send_current_delay(self, force: bool = False, val: Optional[float] = None):
         if not self.client.is_connected():
             return
-        val = float(self.delay_var.get())
+        if val is None:
+            val = float(self.delay_var.get())
+        # Skip redundant writes: compare what would actually go on the wire
+        sent = format(val, DELAY_FORMAT)
+        if not force and sent == self._last_sent:
+            return
         try:
             self.client.set_delay_ms(val)
+            self._last_sent = sent
         except Exception as e:
             self.append_text(f"\n[Serial write error] {e}\n")
 
+    def _on_rx_data(self):
+        # Runs on the reader thread
+        self.event_generate("<<SerialRx>>", when="tail")
+
+    def drain_rx(self):
+        # Pull Teensy output from the RX buffer and display
+        self.client.rx_ready.clear()
+        rx_buf = self.client.rx_buf
+        parts = []
+        while rx_buf:
+            parts.append(rx_buf.popleft())
+        if parts:
+            # One insert/see per drain, however many chunks arrived
+            self.append_text(b"".join(parts).decode(RX_ENCODING))
+
     def poll_rx(self):
-        # Pull Teensy output from the queue and display
-        try:
-            while True:
-                chunk = self.client.rx_queue.get_nowait()
-                self.append_text(chunk)
-        except Empty:
-            pass
-        self.after(40, self.poll_rx)
+        self.drain_rx()
+        self.after(RX_FALLBACK_POLL_MS, self.poll_rx)
 
     def append_text(self, s: str):
-        self.text.insert("end", s)
+        # Buffer the text; it is appended to the widget once per idle cycle
+        self._log_pending.append(s)
+        if self._log_flush_id is None:
+            self._log_flush_id = self.after_idle(self._flush_log)
+
+    def _flush_log(self):
+        self._log_flush_id = None
+        new = "".join(self._log_pending)
+        self._log_pending.clear()
+        if not new:
+            return
+        # Append only the new text (keeps any user selection intact), then drop
+        # however many head lines pushed the console past CONSOLE_MAX_LINES
+        self.text.configure(state="normal")
+        self.text.insert("end-1c", new)
+        self._log_lines += new.count("\n")
+        excess = self._log_lines - CONSOLE_MAX_LINES
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self._log_lines -= excess
+        self.text.configure(state="disabled")
         self.text.see("end")
 
     def on_close(self):
+        self.client.on_data = None
+        if self._log_flush_id is not None:
+            self.after_cancel(self._log_flush_id)
         try:
-            self.client.disconnect()
+            self.client.disconnect(wait=False)
         except Exception:
             pass
+        self._exec.shutdown(wait=False)
         self.destroy()
 
 